@@ -1,6 +1,9 @@
-from amaranth import Signal, Module, Cat, Value, C, unsigned
+from functools import lru_cache
+
+from amaranth import Signal, Module, Cat, Mux, Value, unsigned
 from amaranth.lib import enum
 from amaranth.lib.data import Struct
+from amaranth.lib.memory import Memory
 from amaranth.lib.wiring import Component, Signature, In, Out
 
 from .csr import MCause
@@ -30,12 +33,232 @@ class OpcodeType(enum.Enum):
     SYSTEM = 0b11100
 
 
+class SystemFunct12(enum.Enum):
+    INVALID = 0
+    ECALL = 1
+    EBREAK = 2
+    MRET = 3
+    WFI = 4
+
+
+class Insn(Struct):
+    quadrant: unsigned(2)
+    opcode: OpcodeType
+    rd: unsigned(5)
+    funct3: unsigned(3)
+    rs1: unsigned(5)
+    rs2: unsigned(5)
+    funct7: unsigned(7)
+
+
 class DecodeException(Struct):
     valid: unsigned(1)
     e_type: MCause.Cause
 
 
+class OpcodeROMEntry(Struct):
+    requested_op: unsigned(8)
+    imm_fmt: InsnImmFormat
+    illegal: unsigned(1)
+    # funct7 bits other than bit 30 must be zero for the insn to be legal.
+    check_funct7: unsigned(1)
+    rd_valid: unsigned(1)
+
+
+def opcode_rom_entry(opcode, funct3, alt):
+    """Decode a single opcode/funct3/funct7[5] ("alt") combination.
+
+    SYSTEM insns are marked illegal here; ``Decode`` sub-decodes funct12 and
+    CSR accesses separately.
+    """
+    entry = {
+        "requested_op": 0,
+        "imm_fmt": InsnImmFormat.R,
+        "illegal": 0,
+        "check_funct7": 0,
+        "rd_valid": 1
+    }
+
+    try:
+        opcode = OpcodeType(opcode)
+    except ValueError:
+        # Catch-all for unimplemented major opcodes, including all ones.
+        entry["illegal"] = 1
+        return entry
+
+    match opcode:
+        case OpcodeType.OP_IMM:
+            entry["imm_fmt"] = InsnImmFormat.I
+            if funct3 in (1, 5):
+                entry["requested_op"] = 0x40 | (alt << 3) | funct3
+                entry["check_funct7"] = 1
+                entry["illegal"] = int(funct3 == 1 and alt)
+            else:
+                entry["requested_op"] = 0x40 | funct3
+        case OpcodeType.LUI:
+            entry["imm_fmt"] = InsnImmFormat.U
+            entry["requested_op"] = 0xD0
+        case OpcodeType.AUIPC:
+            entry["imm_fmt"] = InsnImmFormat.U
+            entry["requested_op"] = 0x50
+        case OpcodeType.OP:
+            entry["requested_op"] = 0xC0 | (alt << 3) | funct3
+            entry["check_funct7"] = 1
+            entry["illegal"] = int(funct3 not in (0, 5) and alt)
+        case OpcodeType.JAL:
+            entry["imm_fmt"] = InsnImmFormat.J
+            entry["requested_op"] = 0xB0
+        case OpcodeType.JALR:
+            entry["imm_fmt"] = InsnImmFormat.I
+            entry["requested_op"] = 0x98
+            entry["illegal"] = int(funct3 != 0)
+        case OpcodeType.BRANCH:
+            entry["imm_fmt"] = InsnImmFormat.B
+            entry["requested_op"] = 0x88 | funct3
+            entry["illegal"] = int(funct3 in (2, 3))
+            entry["rd_valid"] = 0
+        case OpcodeType.LOAD:
+            entry["imm_fmt"] = InsnImmFormat.I
+            entry["requested_op"] = 0x08 | funct3
+            entry["illegal"] = int(funct3 in (3, 6, 7))
+        case OpcodeType.STORE:
+            entry["imm_fmt"] = InsnImmFormat.S
+            entry["requested_op"] = 0x80 | funct3
+            entry["illegal"] = int(funct3 >= 3)
+            entry["rd_valid"] = 0
+        case OpcodeType.CUSTOM_0:
+            entry["illegal"] = 1
+        case OpcodeType.MISC_MEM:
+            # RS1 and RD should be ignored for FENCE insn in a base impl.
+            entry["requested_op"] = 0x30
+            entry["illegal"] = int(funct3 != 0)
+            entry["rd_valid"] = 0
+        case OpcodeType.SYSTEM:
+            entry["illegal"] = 1
+
+    return entry
+
+
+def system_rom_init():
+    """Map Cat(funct12[0:3], funct12[8:11]) to a funct3 == 0 SYSTEM insn.
+
+    The remaining funct12 bits (``SYSTEM_FUNCT12_OTHER``) must be zero for
+    any of these insns.
+    """
+    def key(funct12):
+        return (funct12 & 0b111) | ((funct12 >> 5) & 0b111000)
+
+    init = [SystemFunct12.INVALID]*64
+    init[key(0b000000000000)] = SystemFunct12.ECALL
+    init[key(0b000000000001)] = SystemFunct12.EBREAK
+    init[key(0b001100000010)] = SystemFunct12.MRET
+    init[key(0b000100000101)] = SystemFunct12.WFI
+
+    return init
+
+
+SYSTEM_FUNCT12_OTHER = 0b100011111000
+
+
+# Microcode entry points for implemented CSRs, keyed by
+# Cat(csr_op[0:2], <rd or rs1/uimm is zero>, csr_op[2]).
+CSR_OP_MAP = {
+    0b0001: 0x27,  # csrrw
+    0b0101: 0x26,  # csrw
+    0b0010: 0x29,  # csrrs
+    0b0110: 0x28,  # csrr
+    0b0011: 0x2a,  # csrrc
+    0b0111: 0x28,  # csrrc, no write
+    0b1001: 0x2c,  # csrrwi
+    0b1101: 0x2b,  # csrwi
+    0b1010: 0x2d,  # csrrsi
+    0b1110: 0x28,  # csrrsi, no write
+    0b1011: 0x2e,  # csrrci
+    0b1111: 0x28,  # csrrci, no write
+}
+
+
+@lru_cache(maxsize=1)
+def mmode_csr_quadrant_init():
+    def idx(csr_addr):
+        return (csr_addr & 0xff) + ((csr_addr & 0xc00) >> 2)
+
+    # illegal: bit 0 set
+    # zero: bit 1 set
+    # mstatus, mie, mtvec, mscratch, mepc, mcause, mip: both bits clear
+    # ^These registers are actually implemented.
+    init = [1]*1024  # By default, access is illegal.
+
+    init[idx(0xF11)] = 2  # mvendorid
+    init[idx(0xF12)] = 2  # marchid
+    init[idx(0xF13)] = 2  # mimpid
+    init[idx(0xF14)] = 2  # mhartid
+    init[idx(0xF15)] = 2  # mconfigptr
+    init[idx(0x300)] = 0  # mstatus
+    init[idx(0x301)] = 2  # misa
+    init[idx(0x302)] = 1  # medeleg
+    init[idx(0x303)] = 1  # mideleg
+    init[idx(0x304)] = 0  # mie
+    init[idx(0x305)] = 0  # mtvec
+    init[idx(0x306)] = 1  # mcounteren
+    init[idx(0x310)] = 2  # mstatush
+    init[idx(0x340)] = 0  # mscratch
+    init[idx(0x341)] = 0  # mepc
+    init[idx(0x342)] = 0  # mcause
+    init[idx(0x343)] = 2  # mtval
+    init[idx(0x344)] = 0  # mip
+    init[idx(0x34A)] = 1  # mtinst
+    init[idx(0x34B)] = 1  # mtval2
+    init[idx(0x30A)] = 1  # menvcfg
+    init[idx(0x31A)] = 1  # menvcfgh
+    init[idx(0x747)] = 1  # mseccfg
+    init[idx(0x757)] = 1  # mseccfgh
+    for i in range(0x3A0, 0x3B0):
+        init[idx(i)] = 1  # pmpcfg0-15 illegal
+    for i in range(0x3B0, 0x3F0):
+        init[idx(i)] = 1  # pmpaddr0-63 illegal
+    init[idx(0xB00)] = 2  # mcycle
+    init[idx(0xB02)] = 2  # minstret
+    for i in range(0xB03, 0xB1F):
+        init[idx(i)] = 2  # mhpmcounter3-31
+    init[idx(0xB80)] = 2  # mcycleh
+    init[idx(0xB82)] = 2  # minstreth
+    for i in range(0xB83, 0xB8F):
+        init[idx(i)] = 2  # mhpmcounter3h-31
+    init[idx(0x320)] = 2  # mcountinhibit
+    for i in range(0x323, 0x340):
+        init[idx(i)] = 2  # mhpmevent3-31
+    init[idx(0x7A0)] = 1  # tselect
+    init[idx(0x7A1)] = 1
+    init[idx(0x7A2)] = 1
+    init[idx(0x7A3)] = 1  # tdata1-3
+    init[idx(0x7A8)] = 1  # mcontext
+    init[idx(0x7B0)] = 1  # dcsr
+    init[idx(0x7B1)] = 1  # dpc
+    init[idx(0x7B2)] = 1  # dscratch0
+    init[idx(0x7B3)] = 1  # dscratch1
+
+    return tuple(init)
+
+
+DecodeRVFISignature = Signature({
+    "rs1": Out(5),
+    "rs2": Out(5),
+    "rd": Out(5),
+    "rd_valid": Out(1),
+    "do_decode": Out(1),
+    "funct12": Out(12),
+    "funct3": Out(3),
+    "insn": Out(32),
+})
+
+
 class Decode(Component):
+    # Indexed by Cat(funct7[5], funct3, opcode).
+    OPCODE_ROM_INIT = [opcode_rom_entry(a >> 4, (a >> 1) & 0b111, a & 1)
+                       for a in range(512)]
+    SYSTEM_ROM_INIT = system_rom_init()
+
     def __init__(self, *, formal=False):
         self.formal = formal
 
@@ -58,62 +281,184 @@ class Decode(Component):
         }
 
         if self.formal:
-            rvfi = Signature({
-                "rs1": Out(5),
-                "rs2": Out(5),
-                "rd": Out(5),
-                "rd_valid": Out(1),
-                "do_decode": Out(1),
-                "funct12": Out(12),
-                "funct3": Out(3),
-                "insn": Out(32),
-            })
-
-            sig["rvfi"] = In(rvfi)
+            sig["rvfi"] = In(DecodeRVFISignature)
 
         super().__init__(Signature(sig).flip())
 
     def elaborate(self, platform):
         m = Module()
 
-        rd = Signal(5)
-        rs1 = Signal(5)
-        rs2 = Signal(5)
-        funct3 = Signal(3)
-        funct7 = Signal(7)
-        funct12 = Signal(12)
+        # Slice the insn fields once; every use below shares these Values.
+        insn = Insn(self.insn)
+        rd = insn.rd
+        rs1 = insn.rs1
+        rs2 = insn.rs2
+        funct3 = insn.funct3
+        funct7 = insn.funct7
+        # Neither 0 nor 0b0100000; shared by every opcode that checks funct7.
+        funct7_bad = Signal()
+        funct12 = Cat(rs2, funct7)
+        # priv insns require rs1 == rd == 0.
+        zeroes = Signal()
+        csr_encode = Signal(4)
+
+        sign = self.insn[31]
+        imm_fmt = Signal(InsnImmFormat)
+        imm_next = Signal(32)
 
         m.d.comb += [
-            self.opcode.eq(self.insn[2:7]),
-            rd.eq(self.insn[7:12]),
-            funct3.eq(self.insn[12:15]),
-            rs1.eq(self.insn[15:20]),
-            rs2.eq(self.insn[20:25]),
-            funct7.eq(self.insn[25:32]),
-            funct12.eq(self.insn[20:32]),
-            self.src_a_unreg.eq(rs1)
+            self.opcode.eq(insn.opcode),
+            self.src_a_unreg.eq(rs1),
+            funct7_bad.eq(Cat(funct7[0:5], funct7[6]).any()),
+            zeroes.eq((rs1 == 0) & (rd == 0)),
+            csr_encode.eq(Cat(funct12[0:3], funct12[6]))
         ]
 
+        # RISC-V immediate formats deliberately overlap. Rather than build
+        # a full 32-bit Cat per format, mux each field of the immediate
+        # separately and share the sign-extension between formats.
+        sign_ext_20 = Value.replicate(sign, 20)
+        m.d.comb += [
+            imm_next[1:5].eq(self.insn[21:25]),
+            imm_next[5:11].eq(self.insn[25:31]),
+            imm_next[11:31].eq(sign_ext_20),
+            imm_next[31].eq(sign)
+        ]
+
+        with m.Switch(imm_fmt):
+            with m.Case(InsnImmFormat.I):
+                m.d.comb += imm_next[0].eq(self.insn[20])
+            with m.Case(InsnImmFormat.S):
+                m.d.comb += [
+                    imm_next[0].eq(self.insn[7]),
+                    imm_next[1:5].eq(self.insn[8:12]),
+                ]
+            with m.Case(InsnImmFormat.B):
+                m.d.comb += [
+                    imm_next[1:5].eq(self.insn[8:12]),
+                    imm_next[11].eq(self.insn[7]),
+                ]
+            with m.Case(InsnImmFormat.U):
+                m.d.comb += [
+                    imm_next[1:12].eq(0),
+                    imm_next[12:31].eq(self.insn[12:31]),
+                ]
+            with m.Case(InsnImmFormat.J):
+                m.d.comb += [
+                    imm_next[11].eq(self.insn[20]),
+                    imm_next[12:20].eq(self.insn[12:20]),
+                ]
+
+        m.submodules.opcode_rom = opcode_rom_mem = \
+            Memory(shape=OpcodeROMEntry, depth=512,
+                   init=self.OPCODE_ROM_INIT)
+        opcode_rom = opcode_rom_mem.read_port(domain="comb")
+        m.d.comb += [
+            opcode_rom.addr.eq(Cat(funct7[5], funct3, insn.opcode)),
+            imm_fmt.eq(opcode_rom.data.imm_fmt)
+        ]
+
+        m.submodules.system_rom = system_rom_mem = \
+            Memory(shape=SystemFunct12, depth=64, init=self.SYSTEM_ROM_INIT)
+        system_rom = system_rom_mem.read_port(domain="comb")
+        m.d.comb += system_rom.addr.eq(Cat(funct12[0:3], funct12[8:11]))
+
+        # Pack four 2-bit CSR classes per byte; the registered funct12[0:2]
+        # selects the lane once the read completes.
+        quadrant_init = mmode_csr_quadrant_init()
+        csr_map_init = [quadrant_init[i] | quadrant_init[i + 1] << 2 |
+                        quadrant_init[i + 2] << 4 | quadrant_init[i + 3] << 6
+                        for i in range(0, 1024, 4)]
+        m.submodules.csr_map_rom = csr_map_mem = \
+            Memory(shape=8, depth=256, init=csr_map_init)
+        csr_map_rom = csr_map_mem.read_port()
+
         csr_map = Signal(2)
-        with m.Switch(Cat(funct12[0:8], funct12[10:12])):
-            for i, v in enumerate(self.mmode_csr_quadrant_init()):
-                with m.Case(i):
-                    m.d.sync += csr_map.eq(v)
+        csr_map_lane = Signal(2)
+        m.d.comb += [
+            csr_map_rom.addr.eq(Cat(funct12[2:8], funct12[10:12])),
+            csr_map_rom.en.eq(self.do_decode),
+            csr_map.eq(csr_map_rom.data.word_select(csr_map_lane, 2))
+        ]
 
         forward_csr = Signal()
         csr_quadrant = Signal(2)
-        csr_op = Signal.like(funct3)
+        csr_op = Signal(3)
+        csr_op_oh = Signal(8)
         csr_ro_space = Signal()
 
+        # One-hot csr_op, so multi-op tests below reduce to a masked OR.
+        m.d.comb += csr_op_oh.eq(1 << csr_op)
+
+        # Compressed insns and the zero insn are always illegal. Fold that
+        # check into the single exception.valid assignment below instead
+        # of overriding the register after the rest of decode.
+        insn_uncompressed = Signal()
+        insn_illegal = Signal()
+        m.d.comb += [
+            insn_uncompressed.eq(insn.quadrant == 0b11),
+            insn_illegal.eq(opcode_rom.data.illegal |
+                            (opcode_rom.data.check_funct7 & funct7_bad))
+        ]
+
+        # Defaults for every cycle; decode and the second CSR decode cycle
+        # only override what they need. requested_op is only consumed by a
+        # microcode map jump the cycle after it's written, so it need not be
+        # held.
         m.d.sync += [
             forward_csr.eq(0),
+            self.requested_op.eq(0),
             self.exception.e_type.eq(MCause.Cause.ILLEGAL_INSN),
-            self.exception.valid.eq(0),
-            csr_quadrant.eq(funct12[8:10]),
-            csr_op.eq(funct3),
-            csr_ro_space.eq(funct12[10:12] == 0b11)
+            self.exception.valid.eq(self.do_decode &
+                                    (insn_illegal | ~insn_uncompressed))
+        ]
+
+        # SYSTEM insns are illegal according to the ROM unless the
+        # sub-decode below finds a valid funct12/CSR encoding. Decode them
+        # combinationally so do_decode only gates the registers.
+        requested_op_next = Signal(8)
+        e_type_next = Signal(MCause.Cause)
+        csr_access = Signal()
+        m.d.comb += [
+            requested_op_next.eq(opcode_rom.data.requested_op),
+            e_type_next.eq(MCause.Cause.ILLEGAL_INSN)
         ]
 
+        with m.If(self.opcode == OpcodeType.SYSTEM):
+            with m.Switch(funct3):
+                with m.Case(0):
+                    with m.If(zeroes &
+                              ~(funct12 & SYSTEM_FUNCT12_OTHER).any()):
+                        with m.Switch(system_rom.data):
+                            with m.Case(SystemFunct12.ECALL):
+                                m.d.comb += e_type_next.eq(MCause.Cause.ECALL_MMODE)  # noqa: E501
+                            with m.Case(SystemFunct12.EBREAK):
+                                m.d.comb += e_type_next.eq(MCause.Cause.BREAKPOINT)  # noqa: E501
+                            with m.Case(SystemFunct12.MRET):
+                                m.d.comb += [
+                                    requested_op_next.eq(248),
+                                    insn_illegal.eq(0)
+                                ]
+                            with m.Case(SystemFunct12.WFI):
+                                m.d.comb += [
+                                    requested_op_next.eq(0x30),
+                                    insn_illegal.eq(0)
+                                ]
+
+                with m.Case(4):
+                    pass
+                with m.Default():
+                    # CSR ops take two cycles to decode. Rather than
+                    # penalize the rest of the core, have the microcode
+                    # jump to a temporary location. The next cycle
+                    # will have the microcode jump to the _real_ CSR
+                    # routine.
+                    m.d.comb += [
+                        requested_op_next.eq(0x24),
+                        csr_access.eq(1),
+                        insn_illegal.eq(0)
+                    ]
+
         with m.If(self.do_decode):
             m.d.sync += [
                 # For now, unconditionally propogate these and rely on
@@ -121,126 +466,34 @@ class Decode(Component):
                 self.src_a.eq(rs1),
                 self.src_b.eq(rs2),
                 self.dst.eq(rd),
+                self.requested_op.eq(requested_op_next),
+                self.exception.e_type.eq(e_type_next),
+                forward_csr.eq(csr_access),
+                # Only consumed by the forward cycle right after decode.
+                csr_quadrant.eq(funct12[8:10]),
+                csr_map_lane.eq(funct12[0:2]),
+                csr_op.eq(funct3),
+                csr_ro_space.eq(funct12[10:12] == 0b11)
             ]
 
-            # TODO: Might be worth hoisting comb statements out of m.If?
-            with m.Switch(self.opcode):
-                with m.Case(OpcodeType.OP_IMM):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.I))
-
-                    with m.If((funct3 == 1) | (funct3 == 5)):
-                        op_map = Cat(funct3, funct7[-2], C(4))
-                        with m.If(funct3 == 1):
-                            with m.If(funct7 != 0):
-                                m.d.sync += self.exception.valid.eq(1)
-                        with m.Else():
-                            with m.If((funct7 != 0) & (funct7 != 0b0100000)):
-                                m.d.sync += self.exception.valid.eq(1)
-                        m.d.sync += self.requested_op.eq(op_map)
-                    with m.Else():
-                        op_map = Cat(funct3, 0, C(4))
-                        m.d.sync += self.requested_op.eq(op_map)
-                with m.Case(OpcodeType.LUI):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.U))
-                    m.d.sync += self.requested_op.eq(0xD0)
-                with m.Case(OpcodeType.AUIPC):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.U))
-                    m.d.sync += self.requested_op.eq(0x50)
-                with m.Case(OpcodeType.OP):
-                    op_map = Cat(funct3, funct7[-2], C(0xC))
-                    with m.If((funct3 == 0) | (funct3 == 5)):
-                        with m.If((funct7 != 0) & (funct7 != 0b0100000)):
-                            m.d.sync += self.exception.valid.eq(1)
-                        m.d.sync += self.requested_op.eq(op_map)
-                    with m.Else():
-                        with m.If(funct7 != 0):
-                            m.d.sync += self.exception.valid.eq(1)
-                        m.d.sync += self.requested_op.eq(op_map)
-                with m.Case(OpcodeType.JAL):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.J))
-                    m.d.sync += self.requested_op.eq(0xB0)
-                with m.Case(OpcodeType.JALR):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.I))
-                    m.d.sync += self.requested_op.eq(0x98)
-
-                    with m.If(funct3 != 0):
-                        m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.BRANCH):
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.B))
-                    m.d.sync += self.requested_op.eq(Cat(funct3, C(0x11)))
-
-                    with m.If((funct3 == 2) | (funct3 == 3)):
-                        m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.LOAD):
-                    op_map = Cat(funct3, C(1))
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.I))
-                    m.d.sync += self.requested_op.eq(op_map)
-
-                    with m.If((funct3 == 3) | (funct3 == 6) | (funct3 == 7)):
-                        m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.STORE):
-                    op_map = Cat(funct3, C(0x10))
-                    m.d.sync += self.imm.eq(self.imm_bits(InsnImmFormat.S))
-                    m.d.sync += self.requested_op.eq(op_map)
-
-                    with m.If(funct3 >= 3):
-                        m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.CUSTOM_0):
-                    m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.MISC_MEM):
-                    # RS1 and RD should be ignored for FENCE insn in a base
-                    # impl.
-                    m.d.sync += self.requested_op.eq(0x30)
-
-                    with m.If(funct3 != 0):
-                        m.d.sync += self.exception.valid.eq(1)
-                with m.Case(OpcodeType.SYSTEM):
-                    m.d.sync += self.exception.valid.eq(1)
-                    with m.Switch(funct3):
-                        zeroes = (rs1 == 0) & (rd == 0)
-                        with m.Case(0):
-                            with m.If((funct12 == 0) & zeroes):
-                                # ecall
-                                m.d.sync += self.exception.e_type.eq(MCause.Cause.ECALL_MMODE)  # noqa: E501
-                            with m.Elif((funct12 == 1) & zeroes):
-                                # ebreak
-                                m.d.sync += self.exception.e_type.eq(MCause.Cause.BREAKPOINT)  # noqa: E501
-                            with m.Elif((funct12 == 0b001100000010) & zeroes):
-                                # mret
-                                m.d.sync += [
-                                    self.requested_op.eq(248),
-                                    self.exception.valid.eq(0)
-                                ]
-                            with m.Elif((funct12 == 0b000100000101) & zeroes):
-                                # wfi
-                                m.d.sync += [
-                                    self.requested_op.eq(0x30),
-                                    self.exception.valid.eq(0)
-                                ]
-
-                        with m.Case(4):
-                            pass
-                        with m.Default():
-                            # CSR ops take two cycles to decode. Rather than
-                            # penalize the rest of the core, have the microcode
-                            # jump to a temporary location. The next cycle
-                            # will have the microcode jump to the _real_ CSR
-                            # routine.
-                            csr_encode = Cat(funct12[0:3], funct12[6])
-                            m.d.sync += [
-                                self.requested_op.eq(0x24),
-                                forward_csr.eq(1),
-                                self.exception.valid.eq(0),
-                                self.csr_encoding.eq(csr_encode)
-                            ]
+            # R-type (and insns without immediates) leave imm untouched.
+            with m.If(imm_fmt != InsnImmFormat.R):
+                m.d.sync += self.imm.eq(imm_next)
 
-                with m.Default():
-                    # Catch-all for all ones.
-                    m.d.sync += self.exception.valid.eq(1)
+            with m.If(csr_access):
+                m.d.sync += self.csr_encoding.eq(csr_encode)
 
-            # Catch-all for compressed insns, zero insn.
-            with m.If(self.insn[0:2] != 0b11):
-                m.d.sync += self.exception.valid.eq(1)
+        dst_zero = Signal()
+        src_a_zero = Signal()
+        csr_op_key = Signal(4)
+        m.d.comb += [
+            dst_zero.eq(self.dst == 0),
+            src_a_zero.eq(self.src_a == 0),
+            # csrrw[i] care whether rd is x0, the rest whether rs1/uimm is 0.
+            csr_op_key.eq(Cat(csr_op[0:2],
+                              Mux(csr_op[1], src_a_zero, dst_zero),
+                              csr_op[2]))
+        ]
 
         # Second decode cycle if this is a CSR access.
         with m.If(forward_csr):
@@ -249,8 +502,6 @@ class Decode(Component):
 
             m.d.comb += illegal.eq(csr_map[0])
             m.d.comb += ro0.eq(csr_map[1])
-            m.d.sync += self.exception.e_type.eq(MCause.Cause.ILLEGAL_INSN)
-            m.d.sync += self.exception.valid.eq(0)
 
             with m.Switch(csr_quadrant):
                 # Machine Mode CSRs.
@@ -272,56 +523,24 @@ class Decode(Component):
                         with m.If(csr_ro_space):
                             # CSRRW and CSRRWI don't have a mechanism to only
                             # read a register.
-                            with m.If((csr_op == 1) |
-                                      (csr_op == 5) |
-                                      (self.src_a != 0)):
+                            with m.If((csr_op_oh & 0b00100010).any() |
+                                      ~src_a_zero):
                                 m.d.sync += self.exception.valid.eq(1)
 
                     with m.Else():
                         # Jump to microcode routines for actual, implemented
                         # CSR registers.
-                        with m.If((csr_op == 1) & (self.dst == 0)):
-                            # csrw
-                            m.d.sync += self.requested_op.eq(0x26)
-                        with m.Elif((csr_op == 1) & (self.dst != 0)):
-                            # csrrw
-                            m.d.sync += self.requested_op.eq(0x27)
-                        with m.Elif((csr_op == 2) & (self.src_a == 0)):
-                            # csrr
-                            m.d.sync += self.requested_op.eq(0x28)
-                        with m.Elif((csr_op == 2) & (self.src_a != 0)):
-                            # csrrs
-                            m.d.sync += self.requested_op.eq(0x29)
-                        with m.Elif((csr_op == 3) & (self.src_a == 0)):
-                            # csrrc, no write
-                            m.d.sync += self.requested_op.eq(0x28)
-                        with m.Elif((csr_op == 3) & (self.src_a != 0)):
-                            # csrrc
-                            m.d.sync += self.requested_op.eq(0x2a)
-                        with m.Elif((csr_op == 5) & (self.dst == 0)):
-                            # csrwi
-                            m.d.sync += self.requested_op.eq(0x2b)
-                        with m.Elif((csr_op == 5) & (self.dst != 0)):
-                            # csrrwi
-                            m.d.sync += self.requested_op.eq(0x2c)
-                        with m.Elif((csr_op == 6) & (self.src_a == 0)):
-                            # csrrsi, no write
-                            m.d.sync += self.requested_op.eq(0x28)
-                        with m.Elif((csr_op == 6) & (self.src_a != 0)):
-                            # csrrsi
-                            m.d.sync += self.requested_op.eq(0x2d)
-                        with m.Elif((csr_op == 7) & (self.src_a == 0)):
-                            # csrrci, no write
-                            m.d.sync += self.requested_op.eq(0x28)
-                        with m.Elif((csr_op == 7) & (self.src_a != 0)):
-                            # csrrci
-                            m.d.sync += self.requested_op.eq(0x2e)
-                        with m.Else():
-                            # TODO: cover via rvformal.
-                            # This might be reachable, but not while
-                            # requested_op has a meaningful value in it.
-                            # Make sure this is actually the case.
-                            pass
+                        with m.Switch(csr_op_key):
+                            for key, op in CSR_OP_MAP.items():
+                                with m.Case(key):
+                                    m.d.sync += self.requested_op.eq(op)
+                            with m.Default():
+                                # TODO: cover via rvformal.
+                                # csr_op 0 and 4 never forward; this
+                                # might be reachable, but not while
+                                # requested_op has a meaningful value in it.
+                                # Make sure this is actually the case.
+                                pass
 
                 # Other Modes (User, Supervisor).
                 with m.Default():
@@ -338,89 +557,6 @@ class Decode(Component):
                 self.rvfi.insn.eq(self.insn),
             ]
 
-            m.d.comb += self.rvfi.rd_valid.eq(
-                ~((self.opcode == OpcodeType.BRANCH) |
-                  (self.opcode == OpcodeType.MISC_MEM) |
-                  (self.opcode == OpcodeType.STORE)))
+            m.d.comb += self.rvfi.rd_valid.eq(opcode_rom.data.rd_valid)
 
         return m
-
-    def imm_bits(self, imm_type):
-        sign = self.insn[31]
-
-        match imm_type:
-            case InsnImmFormat.I:
-                return Cat(self.insn[20:31], Value.replicate(sign, 21))
-            case InsnImmFormat.S:
-                return Cat(self.insn[7], self.insn[8:12], self.insn[25:31],
-                           Value.replicate(sign, 21))
-            case InsnImmFormat.B:
-                return Cat(C(0), self.insn[8:12], self.insn[25:31],
-                           self.insn[7], Value.replicate(sign, 20))
-            case InsnImmFormat.U:
-                return Cat(C(0, 12), self.insn[12:20], self.insn[20:31], sign)
-            case InsnImmFormat.J:
-                return Cat(C(0), self.insn[21:25], self.insn[25:31],
-                           self.insn[20], self.insn[12:20],
-                           Value.replicate(sign, 12))
-
-    def mmode_csr_quadrant_init(self):
-        def idx(csr_addr):
-            return (csr_addr & 0xff) + ((csr_addr & 0xc00) >> 2)
-
-        # illegal: bit 0 set
-        # zero: bit 1 set
-        # mstatus, mie, mtvec, mscratch, mepc, mcause, mip: both bits clear
-        # ^These registers are actually implemented.
-        init = [1]*1024  # By default, access is illegal.
-
-        init[idx(0xF11)] = 2  # mvendorid
-        init[idx(0xF12)] = 2  # marchid
-        init[idx(0xF13)] = 2  # mimpid
-        init[idx(0xF14)] = 2  # mhartid
-        init[idx(0xF15)] = 2  # mconfigptr
-        init[idx(0x300)] = 0  # mstatus
-        init[idx(0x301)] = 2  # misa
-        init[idx(0x302)] = 1  # medeleg
-        init[idx(0x303)] = 1  # mideleg
-        init[idx(0x304)] = 0  # mie
-        init[idx(0x305)] = 0  # mtvec
-        init[idx(0x306)] = 1  # mcounteren
-        init[idx(0x310)] = 2  # mstatush
-        init[idx(0x340)] = 0  # mscratch
-        init[idx(0x341)] = 0  # mepc
-        init[idx(0x342)] = 0  # mcause
-        init[idx(0x343)] = 2  # mtval
-        init[idx(0x344)] = 0  # mip
-        init[idx(0x34A)] = 1  # mtinst
-        init[idx(0x34B)] = 1  # mtval2
-        init[idx(0x30A)] = 1  # menvcfg
-        init[idx(0x31A)] = 1  # menvcfgh
-        init[idx(0x747)] = 1  # mseccfg
-        init[idx(0x757)] = 1  # mseccfgh
-        for i in range(0x3A0, 0x3B0):
-            init[idx(i)] = 1  # pmpcfg0-15 illegal
-        for i in range(0x3B0, 0x3F0):
-            init[idx(i)] = 1  # pmpaddr0-63 illegal
-        init[idx(0xB00)] = 2  # mcycle
-        init[idx(0xB02)] = 2  # minstret
-        for i in range(0xB03, 0xB1F):
-            init[idx(i)] = 2  # mhpmcounter3-31
-        init[idx(0xB80)] = 2  # mcycleh
-        init[idx(0xB82)] = 2  # minstreth
-        for i in range(0xB83, 0xB8F):
-            init[idx(i)] = 2  # mhpmcounter3h-31
-        init[idx(0x320)] = 2  # mcountinhibit
-        for i in range(0x323, 0x340):
-            init[idx(i)] = 2  # mhpmevent3-31
-        init[idx(0x7A0)] = 1  # tselect
-        init[idx(0x7A1)] = 1
-        init[idx(0x7A2)] = 1
-        init[idx(0x7A3)] = 1  # tdata1-3
-        init[idx(0x7A8)] = 1  # mcontext
-        init[idx(0x7B0)] = 1  # dcsr
-        init[idx(0x7B1)] = 1  # dpc
-        init[idx(0x7B2)] = 1  # dscratch0
-        init[idx(0x7B3)] = 1  # dscratch1
-
-        return init
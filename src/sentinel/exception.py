@@ -1,4 +1,4 @@
-from amaranth import Signal, Module
+from amaranth import Signal, Module, Cat, C
 from amaranth.lib.wiring import Component, Signature, Out, In
 
 from .csr import MCause, MStatus, MIP, MIE
@@ -36,44 +36,53 @@ class ExceptionRouter(Component):
 
         exception = Signal(1)
         mcause_latch = Signal(MCause)
+        # Shared by the load and store address checks.
+        mem_misaligned = Signal()
+        mext_pending = Signal()
 
         m.d.comb += [
             self.out.exception.eq(exception),
-            self.out.mcause.eq(mcause_latch)
+            self.out.mcause.eq(mcause_latch),
+            mem_misaligned.eq(
+                ((self.src.ctrl.mem_sel == MemSel.HWORD) &
+                 self.src.alu_lo[0]) |
+                ((self.src.ctrl.mem_sel == MemSel.WORD) &
+                 self.src.alu_lo.any())),
+            mext_pending.eq(self.src.csr.mstatus.mie &
+                            self.src.csr.mip.meip &
+                            self.src.csr.mie.meie)
         ]
 
-        with m.If(self.src.ctrl.except_ctl == ExceptCtl.LATCH_DECODER):
-            with m.If(self.src.decode.valid):
-                m.d.comb += exception.eq(1)
-                m.d.sync += mcause_latch.cause.eq(self.src.decode.e_type)
+        with m.Switch(self.src.ctrl.except_ctl):
+            with m.Case(ExceptCtl.LATCH_DECODER):
+                with m.If(self.src.decode.valid):
+                    m.d.comb += exception.eq(1)
+                    m.d.sync += mcause_latch.eq(
+                        Cat(self.src.decode.e_type, C(0, 1)))
 
-            with m.If(self.src.csr.mstatus.mie & self.src.csr.mip.meip &
-                      self.src.csr.mie.meie):
-                m.d.comb += exception.eq(1)
-                m.d.sync += [
-                    mcause_latch.cause.eq(11),
-                    mcause_latch.interrupt.eq(1)
-                ]
-        with m.Elif(self.src.ctrl.except_ctl == ExceptCtl.LATCH_STORE_ADR):
-            with m.If((((self.src.ctrl.mem_sel == MemSel.HWORD) &
-                        self.src.alu_lo[0] == 1)) |
-                      ((self.src.ctrl.mem_sel == MemSel.WORD) &
-                      ((self.src.alu_lo[0] == 1) |
-                       (self.src.alu_lo[1] == 1)))):
-                m.d.comb += exception.eq(1)
-                m.d.sync += mcause_latch.cause.eq(
-                    MCause.Cause.STORE_MISALIGNED)
-        with m.Elif(self.src.ctrl.except_ctl == ExceptCtl.LATCH_LOAD_ADR):
-            with m.If((((self.src.ctrl.mem_sel == MemSel.HWORD) &
-                        self.src.alu_lo[0] == 1)) |
-                      ((self.src.ctrl.mem_sel == MemSel.WORD) &
-                      ((self.src.alu_lo[0] == 1) |
-                       (self.src.alu_lo[1] == 1)))):
-                m.d.comb += exception.eq(1)
-                m.d.sync += mcause_latch.cause.eq(MCause.Cause.LOAD_MISALIGNED)
-        with m.Elif(self.src.ctrl.except_ctl == ExceptCtl.LATCH_JAL):
-            with m.If(self.src.alu_lo[1] == 1):
-                m.d.comb += exception.eq(1)
-                m.d.sync += mcause_latch.cause.eq(MCause.Cause.INSN_MISALIGNED)
+                with m.If(mext_pending):
+                    m.d.comb += exception.eq(1)
+                    m.d.sync += mcause_latch.eq(MCause.const({
+                        "cause": MCause.Cause.MEXT_INT,
+                        "interrupt": 1
+                    }))
+            with m.Case(ExceptCtl.LATCH_STORE_ADR):
+                with m.If(mem_misaligned):
+                    m.d.comb += exception.eq(1)
+                    m.d.sync += mcause_latch.eq(MCause.const({
+                        "cause": MCause.Cause.STORE_MISALIGNED
+                    }))
+            with m.Case(ExceptCtl.LATCH_LOAD_ADR):
+                with m.If(mem_misaligned):
+                    m.d.comb += exception.eq(1)
+                    m.d.sync += mcause_latch.eq(MCause.const({
+                        "cause": MCause.Cause.LOAD_MISALIGNED
+                    }))
+            with m.Case(ExceptCtl.LATCH_JAL):
+                with m.If(self.src.alu_lo[1]):
+                    m.d.comb += exception.eq(1)
+                    m.d.sync += mcause_latch.eq(MCause.const({
+                        "cause": MCause.Cause.INSN_MISALIGNED
+                    }))
 
         return m
@@ -369,17 +369,31 @@ class FormalTop(Component):
                 csr_op_shadow.eq(self.cpu.rvfi.decode.funct3)
             ]
 
-        for addr, csr_name, hiword in [
-                (0xF11, "mvendorid", False), (0xF12, "marchid", False),
-                (0xF13, "mimpid", False), (0xF14, "mhartid", False),
-                (0xF15, "mconfigptr", False), (0x301, "misa", False),
-                (0x310, "mstatush", False), (0x343, "mtval", False),
-                (0xB00, "mcycle", False), (0xB02, "minstret", False),
-                # `define RISCV_FORMAL_CSRWH isn't there for mhpmcounter3...
-                # should it be?
-                (0xB03, "mhpmcounter3", False), (0xB80, "mcycle", True),
-                (0xB82, "minstret", True), (0xB83, "mhpmcounter3", True),
-                (0x320, "mcountinhibit", False), (0x323, "mhpmevent3", False)]:
+        ro0_csrs = [
+            (0xF11, "mvendorid", False), (0xF12, "marchid", False),
+            (0xF13, "mimpid", False), (0xF14, "mhartid", False),
+            (0xF15, "mconfigptr", False), (0x301, "misa", False),
+            (0x310, "mstatush", False), (0x343, "mtval", False),
+            (0xB00, "mcycle", False), (0xB02, "minstret", False),
+            # `define RISCV_FORMAL_CSRWH isn't there for mhpmcounter3...
+            # should it be?
+            (0xB03, "mhpmcounter3", False), (0xB80, "mcycle", True),
+            (0xB82, "minstret", True), (0xB83, "mhpmcounter3", True),
+            (0x320, "mcountinhibit", False), (0x323, "mhpmevent3", False)
+        ]
+
+        # What a CSR op would write, computed once for every CSR above.
+        ro0_wdata = Signal(32)
+        with m.If((csr_op_shadow == 1) | ((csr_op_shadow == 2) &
+                  (self.rvfi.rs1_addr != 0))):
+            # csrrw/csrrs
+            m.d.comb += ro0_wdata.eq(self.rvfi.rs1_rdata)
+        with m.Elif((csr_op_shadow == 5) | ((csr_op_shadow == 6) &
+                    (self.rvfi.rs1_addr != 0))):
+            # csrrwi/csrrsi
+            m.d.comb += ro0_wdata.eq(self.rvfi.rs1_addr)
+
+        for addr, csr_name, hiword in ro0_csrs:
             rvfi_csr = getattr(self.rvfi.csr, csr_name)
             m.d.comb += [
                 rvfi_csr.rmask.eq(-1),
@@ -398,31 +412,18 @@ class FormalTop(Component):
                     m.d.comb += rvfi_csr.wmask[:32].eq(-1)
                     m.d.comb += rvfi_csr.wmask[32:].eq(0)
 
-            with m.If(doing_csr_decode):
-                # RVFI CSRW Check mandates this.
-                with m.If(self.cpu.rvfi.exception):
-                    m.d.sync += self.rvfi.rd_addr.eq(0)
+        with m.If(doing_csr_decode):
+            # RVFI CSRW Check mandates this.
+            with m.If(self.cpu.rvfi.exception):
+                m.d.sync += self.rvfi.rd_addr.eq(0)
 
-                with m.If(csr_addr_shadow == addr):
-                    with m.If((csr_op_shadow == 1) | ((csr_op_shadow == 2) &
-                              (self.rvfi.rs1_addr != 0))):
-                        # csrrw/csrrs
-                        if hiword:
-                            m.d.sync += rvfi_csr.wdata[32:].eq(self.rvfi.rs1_rdata)  # noqa: E501
-                        else:
-                            m.d.sync += rvfi_csr.wdata[:32].eq(self.rvfi.rs1_rdata)  # noqa: E501
-                    with m.Elif((csr_op_shadow == 5) |
-                                ((csr_op_shadow == 6) &
-                                (self.rvfi.rs1_addr != 0))):
-                        # csrrwi/csrrsi
-                        if hiword:
-                            m.d.sync += rvfi_csr.wdata[32:].eq(self.rvfi.rs1_addr)  # noqa: E501
-                        else:
-                            m.d.sync += rvfi_csr.wdata[:32].eq(self.rvfi.rs1_addr)  # noqa: E501
-                    with m.Else():
+            with m.Switch(csr_addr_shadow):
+                for addr, csr_name, hiword in ro0_csrs:
+                    rvfi_csr = getattr(self.rvfi.csr, csr_name)
+                    with m.Case(addr):
                         if hiword:
-                            m.d.sync += rvfi_csr.wdata[32:].eq(0)
+                            m.d.sync += rvfi_csr.wdata[32:].eq(ro0_wdata)
                         else:
-                            m.d.sync += rvfi_csr.wdata[:32].eq(0)
+                            m.d.sync += rvfi_csr.wdata[:32].eq(ro0_wdata)
 
         return m
@@ -618,6 +618,76 @@ handler:
     sim.run(testbenches=[cpu_proc], sync_processes=[ucode_panic])
 
 
+# An exception taken after an interrupt must not inherit mcause.interrupt.
+@pytest.mark.module(AttoSoC(sim=True))
+@pytest.mark.clks((1.0 / 12e6,))
+def test_exception_after_interrupt(sim_mod, ucode_panic, cpu_proc_aux,
+                                   basic_ports):
+    sim, m = sim_mod
+
+    m.rom = """
+         csrrwi x0, 28, 0x305  # mtvec
+         addi x1, x0, 1
+         slli x1, x1, 11
+         csrrs x0, x1, 0x304  # mie
+         csrrsi x0, 8, 0x300  # mstatus  # 0x10
+         ecall
+         nop
+handler:
+         dw 0b00110000001000000000000001110011  # mret
+"""
+
+    regs = [
+        RV32Regs(),
+        RV32Regs(PC=4 >> 2),
+        RV32Regs(R1=1, PC=8 >> 2),
+        RV32Regs(R1=0x800, PC=0xC >> 2),
+        RV32Regs(R1=0x800, PC=0x10 >> 2),
+        RV32Regs(R1=0x800, PC=0x14 >> 2),
+        # Interrupt taken in place of the ecall.
+        RV32Regs(R1=0x800, PC=0x1C >> 2),
+        RV32Regs(R1=0x800, PC=0x14 >> 2),
+        # ecall
+        RV32Regs(R1=0x800, PC=0x1C >> 2),
+        RV32Regs(R1=0x800, PC=0x14 >> 2),
+    ]
+
+    ram = [None]*len(regs)
+
+    csrs = [
+        CSRRegs(MIP=0x800),  # 0x0
+        CSRRegs(MTVEC=0x1C, MIP=0x800),
+        CSRRegs(MTVEC=0x1C, MIP=0x800),
+        CSRRegs(MTVEC=0x1C, MIP=0x800),
+        CSRRegs(MTVEC=0x1C, MIP=0x800, MIE=0x800),
+        CSRRegs(MSTATUS=0b11000_0000_1000, MTVEC=0x1C, MIP=0x800,
+                MIE=0x800),
+        CSRRegs(MSTATUS=0b11000_1000_0000, MTVEC=0x1C, MEPC=0x14,
+                MCAUSE=0x8000000B, MIE=0x800),
+        CSRRegs(MSTATUS=0b11000_1000_1000, MTVEC=0x1C, MEPC=0x14,
+                MCAUSE=0x8000000B, MIE=0x800),
+        CSRRegs(MSTATUS=0b11000_1000_0000, MTVEC=0x1C, MEPC=0x14,
+                MCAUSE=11, MIE=0x800),
+        CSRRegs(MSTATUS=0b11000_1000_1000, MTVEC=0x1C, MEPC=0x14,
+                MCAUSE=11, MIE=0x800),
+    ]
+
+    def cpu_proc():
+        yield from cpu_proc_aux(regs, ram, csrs)
+
+    # Hold the external interrupt until the handler is entered.
+    def irq_proc():
+        yield Passive()
+
+        yield m.cpu.irq.eq(1)
+        while (yield m.cpu.datapath.pc.dat_r) != (0x1C >> 2):
+            yield Tick()
+        yield m.cpu.irq.eq(0)
+
+    sim.ports = basic_ports
+    sim.run(testbenches=[cpu_proc], sync_processes=[ucode_panic, irq_proc])
+
+
 # Infrequently-used test mostly for testing address decoding. Should not cause
 # failure if user does not have Rust installed.
 @pytest.mark.module(AttoSoC(sim=False, num_bytes=0x1000))